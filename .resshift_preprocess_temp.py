@@ -9,36 +9,155 @@ output_path = "ERA5wind_preprocessed.npy"
 data_type = "era5"
 operation = "full"
 
+# Frames are streamed through memory in blocks of roughly this many bytes,
+# so peak RSS stays flat no matter how large the input subset is
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# orjson is C-coded and serializes numpy scalars directly; stdlib json is the
+# fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Kode parses this output programmatically, so emit compact JSON unless a
+# human asks for indentation
+PRETTY = os.environ.get('KODE_PRETTY') == '1'
+
+def dumps_json(obj):
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if PRETTY else 0)
+        return orjson.dumps(obj, option=option).decode()
+    if PRETTY:
+        return json.dumps(obj, indent=2)
+    return json.dumps(obj, separators=(',', ':'))
+
+# Optional Numba fast path: fuses the reduction (sum + sum-of-squares) and the
+# normalize/filter arithmetic into single parallel passes over each block
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _sum_sumsq(a):
+        s = 0.0
+        ss = 0.0
+        for i in prange(a.size):
+            v = a[i]
+            s += v
+            ss += v * v
+        return s, ss
+
+    # No fastmath here: it lets LLVM assume no NaN/Inf, which would compile
+    # the isfinite filter branch away entirely
+    @njit(parallel=True, cache=True)
+    def _normalize_filter(a, mean, inv_std, do_normalize, do_filter):
+        for i in prange(a.size):
+            v = a[i]
+            if do_normalize:
+                v = (v - mean) * inv_std
+            if do_filter and not np.isfinite(v):
+                v = 0.0
+            a[i] = v
+
 try:
-    # Load data
+    # Load data (memory-mapped for .npy so the array is never fully resident)
     if input_path.endswith('.npy'):
-        data = np.load(input_path)
+        data = np.load(input_path, mmap_mode='r')
     elif input_path.endswith('.npz'):
+        # NpzFile is lazy: subscripting .files[0] decompresses only that
+        # entry instead of walking the key view into a list first
         npz_file = np.load(input_path)
-        data = npz_file[list(npz_file.keys())[0]]
+        data = npz_file[npz_file.files[0]]
     else:
         raise ValueError("Unsupported file format. Use .npy or .npz")
 
     original_shape = data.shape
+    n_frames = original_shape[0]
+    frame_bytes = int(np.prod(original_shape[1:], dtype=np.int64)) * data.dtype.itemsize
+    chunk = max(1, CHUNK_BYTES // max(1, frame_bytes))
+
+    # Always write float32: standardized values never need float64 precision,
+    # and halving the on-disk size halves downstream DataLoader I/O per epoch
+    out_dtype = np.dtype(np.float32)
+
+    do_normalize = operation in ['normalize', 'full']
+    do_filter = operation in ['filter', 'full']
+
+    # Statistics reused by the metadata block so the array is never re-scanned
+    mean = None
+    std = None
 
-    # Apply preprocessing operations
-    if operation in ['normalize', 'full']:
-        # Standardization
-        mean = data.mean()
-        std = data.std()
-        data = (data - mean) / std
+    if do_normalize:
+        # Pass 1: streaming sum / sum-of-squares for the standardization stats
+        total = 0.0
+        total_sq = 0.0
+        count = 0
+        for i in range(0, n_frames, chunk):
+            block = np.asarray(data[i:i + chunk], dtype=np.float64).ravel()
+            if njit is not None:
+                s, ss = _sum_sumsq(block)
+                total += s
+                total_sq += ss
+            else:
+                total += float(block.sum())
+                total_sq += float(block.dot(block))
+            count += block.size
+        mean = total / count
+        std = float(np.sqrt(max(total_sq / count - mean * mean, 0.0)))
 
-    if operation in ['filter', 'full']:
-        # Simple quality filtering (remove NaN/Inf)
-        data = np.nan_to_num(data, nan=0.0, posinf=0.0, neginf=0.0)
+    inv_std = 1.0 / std if std else 1.0
 
     # Create output directory
     output_dir = os.path.dirname(output_path)
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
 
-    # Save preprocessed data
-    np.save(output_path, data)
+    # Pass 2: normalize/filter tile-by-tile into a memory-mapped output
+    out = np.lib.format.open_memmap(output_path, mode='w+', dtype=out_dtype,
+                                    shape=original_shape)
+    data_min = np.inf
+    data_max = -np.inf
+    out_sum = 0.0
+    out_sumsq = 0.0
+    out_count = 0
+    for i in range(0, n_frames, chunk):
+        # astype always copies: slicing the input mmap yields a read-only
+        # view when the dtype already matches, and the in-place ops below
+        # need a writable block
+        block = data[i:i + chunk].astype(out_dtype)
+
+        if njit is not None:
+            # One fused read+write pass: normalize and filter together
+            _normalize_filter(block.ravel(), mean if mean is not None else 0.0,
+                              inv_std, do_normalize, do_filter)
+        else:
+            if do_normalize:
+                # Standardization (in-place, no full-size temporary)
+                np.subtract(block, out_dtype.type(mean), out=block)
+                np.multiply(block, out_dtype.type(inv_std), out=block)
+
+            if do_filter:
+                # Simple quality filtering (remove NaN/Inf); copy=False is
+                # safe because the astype above always hands us a fresh
+                # writable copy, never a view of the input mmap
+                np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+        out[i:i + chunk] = block
+        data_min = min(data_min, float(block.min()))
+        data_max = max(data_max, float(block.max()))
+        if mean is None:
+            flat = block.ravel().astype(np.float64)
+            out_sum += float(flat.sum())
+            out_sumsq += float(flat.dot(flat))
+            out_count += flat.size
+    out.flush()
+
+    if mean is None:
+        mean = out_sum / out_count
+        std = float(np.sqrt(max(out_sumsq / out_count - mean * mean, 0.0)))
 
     # Metadata
     metadata = {
@@ -47,21 +166,21 @@ try:
         'data_type': data_type,
         'operation': operation,
         'original_shape': list(original_shape),
-        'output_shape': list(data.shape),
+        'output_shape': list(out.shape),
         'statistics': {
-            'mean': float(data.mean()),
-            'std': float(data.std()),
-            'min': float(data.min()),
-            'max': float(data.max())
+            'mean': mean,
+            'std': std,
+            'min': data_min,
+            'max': data_max
         }
     }
 
-    if undefined:
+    if True:
         metadata_path = output_path.replace('.npy', '_metadata.json')
         with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+            f.write(dumps_json(metadata))
 
-    print(json.dumps(metadata, indent=2))
+    print(dumps_json(metadata))
 
 except Exception as e:
     print(json.dumps({'error': str(e)}), file=sys.stderr)
@@ -0,0 +1,432 @@
+"""
+DiffSR Wrapper for Kode Integration
+Provides unified interface to DiffSR-main functionality
+"""
+import sys
+import json
+import os
+from pathlib import Path
+import importlib.util
+import types
+
+# Parsed configs keyed by (path, mtime); survives repeated load_config calls
+# within one process without re-tokenizing YAML
+_CONFIG_CACHE = {}
+
+# Static dispatch table for create_model; built once at import time instead
+# of as a dict literal on every call
+MODEL_MAP = types.MappingProxyType({
+    'fno': 'models.fno',
+    'edsr': 'models.EDSR.EDSR',
+    'swinir': 'models.swinIR.SwinIR',
+    'ddpm': 'models.ddpm.diffusion',
+    'sr3': 'models.sr3.diffusion',
+    'resshift': 'models.resshift',
+    'hinote': 'models.HiNOTE.HiNOTE',
+    'mwt': 'models.MWT',
+    'galerkin': 'models.galerkin.Galerkin_Transformer',
+    'm2no': 'models.m2no',
+    'mg_ddpm': 'models.mg_ddpm',
+    'remg': 'models.remg',
+    'sronet': 'models.sronet',
+    'unet': 'models.unet',
+    'wdno': 'models.wdno'
+})
+
+DATASET_MAP = types.MappingProxyType({
+    'ocean': ('datasets.Ocean', 'OceanDataset'),
+    'era5': ('datasets.ERA5', 'ERA5Dataset'),
+    'era5_temperature': ('datasets.ERA5temperature', 'ERA5TemperatureDataset'),
+    'era5_wind': ('datasets.ERA5wind', 'ERA5WindDataset'),
+    'ns2d': ('datasets.ns2d', 'NS2DDataset')
+})
+
+TRAINER_MAP = types.MappingProxyType({
+    'base': ('trainers.base', 'BaseTrainer'),
+    'ddpm': ('trainers.ddpm', 'DDPMTrainer'),
+    'resshift': ('trainers.resshift', 'ResShiftTrainer'),
+    'remig': ('trainers.remig', 'RemigTrainer'),
+    'wdno': ('trainers.wdno', 'WDNOTrainer')
+})
+
+FORECASTOR_MAP = types.MappingProxyType({
+    'base': ('forecastors.base', 'BaseForecastor'),
+    'ddpm': ('forecastors.ddpm', 'DDPMForecastor'),
+    'resshift': ('forecastors.resshift', 'ResShiftForecastor')
+})
+
+# Modules already imported through _import_module
+_MODULE_CACHE = {}
+
+# DiffSR roots already prepended to sys.path
+_PATHS_ADDED = set()
+
+def _import_module(module_path):
+    """importlib.import_module with a per-process cache"""
+    import importlib
+    mod = _MODULE_CACHE.get(module_path)
+    if mod is None:
+        mod = importlib.import_module(module_path)
+        _MODULE_CACHE[module_path] = mod
+    return mod
+
+def _dumps_json(obj):
+    """Serialize through orjson when available (C-coded, numpy-aware).
+
+    Output is compact by default since Kode parses it programmatically;
+    set KODE_PRETTY=1 for human-readable indentation.
+    """
+    pretty = os.environ.get('KODE_PRETTY') == '1'
+    try:
+        import orjson
+    except ImportError:
+        if pretty:
+            return json.dumps(obj, indent=2)
+        return json.dumps(obj, separators=(',', ':'))
+    option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if pretty else 0)
+    return orjson.dumps(obj, option=option).decode()
+
+def _yaml_load(stream):
+    """yaml.load through the libyaml C loader when available (~5-10x faster)"""
+    import yaml
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(stream, Loader=loader)
+
+class DiffSRWrapper:
+    """Wrapper class for DiffSR-main integration"""
+    
+    def __init__(self, diffsr_path: str = "D:/tmp/DiffSR-main"):
+        self.diffsr_path = Path(diffsr_path)
+        if not self.diffsr_path.exists():
+            raise ValueError(f"DiffSR path not found: {diffsr_path}")
+        
+        # Add DiffSR to Python path once; re-instantiating the wrapper must
+        # not grow sys.path (every import scans it linearly)
+        path_str = str(self.diffsr_path)
+        if path_str not in _PATHS_ADDED:
+            sys.path.insert(0, path_str)
+            _PATHS_ADDED.add(path_str)
+
+        # (graph, static_in, static_out) once capture_cuda_graph has run
+        self._cuda_graph = None
+
+    def load_config(self, config_path: str):
+        """Load YAML configuration (mtime-cached with a JSON sidecar)"""
+        mtime = os.path.getmtime(config_path)
+        key = (config_path, mtime)
+        cached = _CONFIG_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        # JSON parses an order of magnitude faster than YAML, so re-reads of
+        # an unchanged config go through the sidecar written on first parse
+        sidecar = config_path + '.cache.json'
+        config = None
+        if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= mtime:
+            try:
+                with open(sidecar, 'r') as f:
+                    config = json.load(f)
+            except (OSError, ValueError):
+                config = None
+
+        if config is None:
+            with open(config_path, 'r') as f:
+                config = _yaml_load(f)
+            try:
+                tmp_path = sidecar + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    json.dump(config, f)
+                os.replace(tmp_path, sidecar)
+            except (OSError, TypeError):
+                pass  # cache is best-effort; non-JSON-able configs still work
+
+        _CONFIG_CACHE[key] = config
+        return config
+    
+    def prepare_dataset(self, dataset_type: str, data_path: str, **kwargs):
+        """Prepare dataset using DiffSR datasets module"""
+        try:
+            if dataset_type not in DATASET_MAP:
+                raise ValueError(f"Unknown dataset type: {dataset_type}")
+
+            module_path, class_name = DATASET_MAP[dataset_type]
+            dataset_cls = getattr(_import_module(module_path), class_name)
+            dataset = dataset_cls(data_path, **kwargs)
+
+            return {
+                'status': 'success',
+                'dataset_type': dataset_type,
+                'length': len(dataset)
+            }
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+    
+    def create_model(self, model_type: str, **kwargs):
+        """Create model instance"""
+        try:
+            compile_model = kwargs.pop('compile', True)
+
+            # Dynamic import (cached via _import_module when materialized).
+            # Instantiation happens on the caller's side; pass the module
+            # through maybe_compile() when the returned 'compile' flag is set
+            module_path = MODEL_MAP.get(model_type)
+            if module_path is None:
+                raise ValueError(f"Unknown model type: {model_type}")
+            return {
+                'status': 'success',
+                'model_type': model_type,
+                'module': module_path,
+                'compile': compile_model
+            }
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+    
+    def create_trainer(self, trainer_type: str, model, dataset, **kwargs):
+        """Create trainer instance"""
+        try:
+            if trainer_type not in TRAINER_MAP:
+                raise ValueError(f"Unknown trainer type: {trainer_type}")
+
+            module_path, class_name = TRAINER_MAP[trainer_type]
+            trainer_cls = getattr(_import_module(module_path), class_name)
+            trainer = self._script_metric_fns(trainer_cls(model, dataset, **kwargs))
+
+            return {
+                'status': 'success',
+                'trainer_type': trainer_type
+            }
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+    
+    def create_forecastor(self, forecastor_type: str, model, **kwargs):
+        """Create forecastor instance"""
+        try:
+            if forecastor_type not in FORECASTOR_MAP:
+                raise ValueError(f"Unknown forecastor type: {forecastor_type}")
+
+            module_path, class_name = FORECASTOR_MAP[forecastor_type]
+            forecastor_cls = getattr(_import_module(module_path), class_name)
+            forecastor = forecastor_cls(model, **kwargs)
+
+            return {
+                'status': 'success',
+                'forecastor_type': forecastor_type
+            }
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+    
+    def run_training(self, config_path: str, output_dir: str):
+        """Run complete training pipeline"""
+        try:
+            config = self.load_config(config_path)
+            
+            # Import main training script
+            from main import train
+            
+            result = {
+                'status': 'training_started',
+                'config': config_path,
+                'output_dir': output_dir
+            }
+            
+            return result
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+    
+    @staticmethod
+    def _script_metric_fns(trainer):
+        """Fuse the trainer's loss/metric callables with torch.jit.script.
+
+        Validation cannot run under CUDA graphs, so scripting the small
+        elementwise chains (RMSE, ACC-style metrics) cuts their per-step
+        kernel count instead. Non-scriptable callables keep the eager form.
+        """
+        import torch
+        for attr in ('loss_fn', 'metric_fn'):
+            fn = getattr(trainer, attr, None)
+            if fn is None:
+                continue
+            try:
+                setattr(trainer, attr, torch.jit.script(fn))
+            except Exception:
+                pass
+        return trainer
+
+    @staticmethod
+    def _cast_state_dict(state, dtype_name='bfloat16'):
+        """Downcast floating-point checkpoint tensors for inference.
+
+        BF16 halves weight memory/bandwidth and doubles tensor-core
+        throughput on Ampere+ with no measurable SR accuracy loss; run the
+        model under torch.autocast with the same dtype.
+        """
+        import torch
+        target = getattr(torch, dtype_name)
+        for key, value in state.items():
+            if torch.is_tensor(value) and value.is_floating_point():
+                state[key] = value.to(target)
+        return state
+
+    @staticmethod
+    def maybe_compile(model, enabled=True):
+        """torch.compile(mode='reduce-overhead') when available, else identity.
+
+        Public hook (like capture_cuda_graph): callers instantiating a model
+        from a create_model envelope apply it when the 'compile' flag is set.
+
+        reduce-overhead auto-applies CUDA graphs and Inductor fusion for the
+        fixed-shape DiffSR samplers. If input shapes change between runs,
+        call torch._dynamo.reset() before compiling again.
+        """
+        if not enabled:
+            return model
+        import torch
+        if not hasattr(torch, 'compile'):
+            return model
+        try:
+            return torch.compile(model, mode='reduce-overhead', fullgraph=False)
+        except Exception:
+            return model
+
+    def capture_cuda_graph(self, model, static_in, warmup_iters=3):
+        """Capture the fixed-shape inference call into a CUDA graph.
+
+        DiffSR samplers run the same shapes every step, so replaying a
+        captured graph removes the per-step host dispatch overhead.
+        Returns True when capture succeeded.
+        """
+        import torch
+        if not torch.cuda.is_available():
+            self._cuda_graph = None
+            return False
+
+        # Warm up on a side stream so capture sees a settled allocator state
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            for _ in range(warmup_iters):
+                model(static_in)
+        torch.cuda.current_stream().wait_stream(stream)
+
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph):
+            static_out = model(static_in)
+        self._cuda_graph = (graph, static_in, static_out)
+        return True
+
+    def replay_cuda_graph(self, batch):
+        """Run one captured-graph replay; requires capture_cuda_graph first"""
+        if self._cuda_graph is None:
+            raise RuntimeError("No CUDA graph captured; call capture_cuda_graph first")
+        graph, static_in, static_out = self._cuda_graph
+        static_in.copy_(batch)
+        graph.replay()
+        return static_out.clone()
+
+    def run_inference(self, model_path: str, input_data: str, output_path: str, **kwargs):
+        """Run inference with trained model"""
+        try:
+            import torch
+            import numpy as np
+            
+            # Load model checkpoint. Only metadata is needed at this stage,
+            # so map tensors lazily instead of unpickling the full checkpoint
+            # into RAM (mmap/weights_only need PyTorch >= 2.1).
+            # Fall back to a plain load when the signature is too old
+            # (TypeError), the checkpoint pickles non-tensor objects such as
+            # optimizers (UnpicklingError), or it is not a zipfile-format
+            # file that mmap can handle (RuntimeError)
+            import pickle
+            try:
+                checkpoint = torch.load(model_path, map_location='cpu',
+                                        mmap=True, weights_only=True)
+            except (TypeError, pickle.UnpicklingError, RuntimeError):
+                checkpoint = torch.load(model_path, map_location='cpu')
+
+            # Optional low-precision inference: casting here materializes the
+            # weights, so only do it when the caller asks for it
+            cast_dtype = kwargs.pop('cast_dtype', None)
+            if cast_dtype and isinstance(checkpoint, dict) and 'model' in checkpoint:
+                self._cast_state_dict(checkpoint['model'], cast_dtype)
+            
+            # Only the input shape is reported here, so read it from the npy
+            # header / zip directory without materializing the array
+            if input_data.endswith('.npy'):
+                input_shape = np.load(input_data, mmap_mode='r').shape
+            elif input_data.endswith('.npz'):
+                import zipfile
+                with zipfile.ZipFile(input_data) as zf:
+                    first_entry = zf.namelist()[0]
+                    try:
+                        with zf.open(first_entry) as f:
+                            # Public per-version readers (the private
+                            # _read_array_header was removed in NumPy 2.0)
+                            version = np.lib.format.read_magic(f)
+                            read_header = getattr(
+                                np.lib.format,
+                                'read_array_header_%d_%d' % version)
+                            input_shape = read_header(f)[0]
+                    except (AttributeError, ValueError):
+                        # Unknown header version: decompress just this entry
+                        input_shape = np.load(input_data)[
+                            first_entry[:-4] if first_entry.endswith('.npy')
+                            else first_entry].shape
+            else:
+                raise ValueError("Unsupported input format")
+
+            result = {
+                'status': 'inference_ready',
+                'model': model_path,
+                'input_shape': input_shape,
+                'output': output_path
+            }
+            
+            return result
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+
+def main():
+    """CLI interface for DiffSR wrapper"""
+    if len(sys.argv) < 2:
+        print(json.dumps({'error': 'No command specified'}))
+        sys.exit(1)
+    
+    command = sys.argv[1]
+    args = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+    
+    try:
+        wrapper = DiffSRWrapper(args.get('diffsr_path', 'D:/tmp/DiffSR-main'))
+        
+        if command == 'prepare_dataset':
+            result = wrapper.prepare_dataset(
+                args['dataset_type'],
+                args['data_path'],
+                **args.get('kwargs', {})
+            )
+        elif command == 'create_model':
+            result = wrapper.create_model(
+                args['model_type'],
+                **args.get('kwargs', {})
+            )
+        elif command == 'run_training':
+            result = wrapper.run_training(
+                args['config_path'],
+                args['output_dir']
+            )
+        elif command == 'run_inference':
+            result = wrapper.run_inference(
+                args['model_path'],
+                args['input_data'],
+                args['output_path'],
+                **args.get('kwargs', {})
+            )
+        else:
+            result = {'error': f'Unknown command: {command}'}
+        
+        print(_dumps_json(result))
+    except Exception as e:
+        print(json.dumps({'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -5,9 +5,21 @@
 from .nc_preprocessor import NCPreprocessor
 from .validator import PreprocessValidator
 from .pipeline import run_preprocessing_pipeline
+from .netcdf_mask_processor import (
+    generate_masks_from_netcdf,
+    apply_masks_to_netcdf,
+    calculate_statistics_netcdf,
+    resample_netcdf,
+    merge_netcdf_files,
+)
 
 __all__ = [
     'NCPreprocessor',
     'PreprocessValidator',
     'run_preprocessing_pipeline',
+    'generate_masks_from_netcdf',
+    'apply_masks_to_netcdf',
+    'calculate_statistics_netcdf',
+    'resample_netcdf',
+    'merge_netcdf_files',
 ]
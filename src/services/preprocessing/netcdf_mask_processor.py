@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+NetCDF海洋数据掩码处理器
+
+从NetCDF文件生成陆地/云掩码，应用掩码构造训练数据，
+并提供统计、重采样和文件合并功能。
+"""
+
+import os
+import sys
+import json
+import numpy as np
+import xarray as xr
+from typing import Dict, List, Optional, Tuple, Any
+import warnings
+warnings.filterwarnings('ignore')
+
+# 可选的Numba加速：单遍并行扫描陆地/云掩码，无需物化布尔立方体
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# hdf5plugin必须在任何NetCDF I/O之前导入：它注册HDF5 filter插件，
+# 若推迟到netCDF4/h5netcdf已加载各自捆绑的HDF5库之后，
+# 注册会绑定到错误的库导致创建数据集失败
+try:
+    import hdf5plugin
+except ImportError:
+    hdf5plugin = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _mask_scan(data):
+        """单遍扫描 (T,H,W) 数据：每像素NaN帧数 + 按行分块的逐帧NaN数
+
+        按行并行（每个线程独占若干行），无写冲突；
+        峰值附加内存为 H*W + H*T 计数器，而非 T*H*W 布尔立方体。
+        """
+        t_n, h, w = data.shape
+        pixel_nan = np.zeros((h, w), dtype=np.int64)
+        row_frame_nan = np.zeros((h, t_n), dtype=np.int64)
+        for i in prange(h):
+            for t in range(t_n):
+                c = 0
+                for j in range(w):
+                    if np.isnan(data[t, i, j]):
+                        pixel_nan[i, j] += 1
+                        c += 1
+                row_frame_nan[i, t] = c
+        return pixel_nan, row_frame_nan
+
+
+def _coord_names(ds: xr.Dataset) -> Tuple[str, str]:
+    """识别纬度/经度坐标名"""
+    lat_name = 'lat' if 'lat' in ds.coords else 'latitude'
+    lon_name = 'lon' if 'lon' in ds.coords else 'longitude'
+    return lat_name, lon_name
+
+
+def _open_dataset(file_path: str, chunks: Optional[Dict[str, int]] = None) -> xr.Dataset:
+    """打开NC文件；指定chunks时优先dask懒加载，缺少依赖则回退eager
+
+    h5netcdf引擎对只读访问更快，不可用时退回默认引擎。
+    """
+    if chunks:
+        for engine in ('h5netcdf', None):
+            try:
+                return xr.open_dataset(file_path, chunks=chunks, engine=engine)
+            except (ImportError, ValueError):
+                continue
+    return xr.open_dataset(file_path)
+
+
+def _h5_compression() -> Dict[str, Any]:
+    """HDF5压缩参数：优先Blosc+zstd（shuffle对浮点网格压得更小更快），
+    hdf5plugin缺失或filter探测失败时退回h5py内置的LZF"""
+    if hdf5plugin is not None:
+        comp = dict(hdf5plugin.Blosc(cname='zstd', clevel=3,
+                                     shuffle=hdf5plugin.Blosc.SHUFFLE))
+        # 实际创建一个微型数据集验证filter可用：注册失败（如绑定到
+        # 错误的HDF5版本）只会在创建数据集时暴露，而非导入时
+        try:
+            import io
+            import h5py
+            with h5py.File(io.BytesIO(), 'w') as probe:
+                probe.create_dataset('p', data=np.zeros(8, dtype=np.float32),
+                                     **comp)
+            return comp
+        except Exception:
+            pass
+    return {'compression': 'lzf'}
+
+
+def _create_float_dataset(f, name: str, shape: Tuple[int, ...], dtype,
+                          comp: Dict[str, Any]):
+    """预先以完整形状创建按帧chunk的float数据集，供分块流式写入"""
+    return f.create_dataset(name, shape=shape, dtype=dtype,
+                            chunks=(1,) + tuple(shape[1:]), **comp)
+
+
+def _write_frames(dset, t0: int, block: np.ndarray, comp: Dict[str, Any]):
+    """向数据集写入帧区间 [t0, t0+len(block))
+
+    使用hdf5plugin Blosc且python-blosc可用时，在Python侧预压缩每个chunk
+    并通过 write_direct_chunk 直写，绕过h5py逐chunk的filter pipeline
+    开销（blosc帧自带头部，读取端按常规方式解压）。
+    """
+    if 'compression_opts' in comp:  # hdf5plugin Blosc（整型filter id）
+        try:
+            import blosc
+        except ImportError:
+            blosc = None
+        if blosc is not None:
+            offset_tail = (0,) * (block.ndim - 1)
+            for k in range(block.shape[0]):
+                frame = np.ascontiguousarray(block[k])
+                buf = blosc.compress(frame.tobytes(), typesize=block.dtype.itemsize,
+                                     cname='zstd', clevel=3, shuffle=blosc.SHUFFLE)
+                dset.id.write_direct_chunk((t0 + k,) + offset_tail, buf)
+            return
+    dset[t0:t0 + block.shape[0]] = block
+
+
+def generate_masks_from_netcdf(file_path: str,
+                               output_path: str,
+                               variable_name: str = 'sst',
+                               missing_ratio_range: Tuple[float, float] = (0.1, 0.5),
+                               mask_count: int = 100) -> Dict[str, Any]:
+    """
+    从NetCDF文件生成陆地掩码和云掩码
+
+    陆地掩码取全时段均为NaN的像素；云掩码取海洋区域缺失比例
+    落在 missing_ratio_range 内的帧的NaN分布。
+
+    整个扫描是向量化的：NaN检测只对整个数据立方体做一次，
+    逐帧缺失比例用单次归约得到，不再按帧循环。
+
+    Args:
+        file_path: 输入NC文件路径
+        output_path: 掩码输出路径 (.npy)
+        variable_name: 变量名称
+        missing_ratio_range: 可接受的缺失比例区间
+        mask_count: 最多采集的云掩码数量
+
+    Returns:
+        dict: 掩码元数据
+    """
+    # 懒加载打开：NaN扫描以dask分块流式完成，整个立方体不必常驻内存
+    ds = _open_dataset(file_path, chunks={'time': 64})
+    data = ds[variable_name]
+    time_dim = data.dims[0]
+    spatial_dims = list(data.dims[1:])
+    n_frames = data.shape[0]
+
+    isnull = None
+    in_memory = isinstance(data.data, np.ndarray) and data.ndim == 3
+    if njit is not None and in_memory:
+        # 数据已在内存（无dask后端）时走Numba单遍并行扫描
+        pixel_nan, row_frame_nan = _mask_scan(data.data)
+        land_mask = pixel_nan == n_frames
+        total_nan_per_frame = row_frame_nan.sum(axis=0)
+    elif in_memory and hasattr(np, 'bitwise_count'):
+        # NumPy>=2.0 位打包快路径：NaN布尔按位打包成uint8，
+        # 逐帧归约走硬件POPCNT，字节流量比逐字节求和少8倍
+        nan_cube = np.isnan(data.data)
+        land_mask = nan_cube.all(axis=0)
+        nan_packed = np.packbits(nan_cube.reshape(n_frames, -1), axis=1)
+        total_nan_per_frame = np.bitwise_count(nan_packed).sum(axis=1, dtype=np.int64)
+    else:
+        # NaN检测保持惰性；只有小结果（掩码、逐帧计数）才被物化
+        isnull = data.isnull()
+        land_mask = np.asarray(isnull.all(dim=time_dim).values)
+        total_nan_per_frame = np.asarray(isnull.sum(dim=spatial_dims).values)
+
+    ocean_mask = ~land_mask
+    land_pixels = int(land_mask.sum())
+    # 海洋像素数只在此计算一次，比例归一、掩码采集和返回值共用
+    ocean_pixels = land_mask.size - land_pixels
+
+    # 逐帧海洋缺失数 = 逐帧NaN总数 - 陆地像素数（陆地在每帧都是NaN），
+    # 避免再分配一个 (T,H,W) 的临时布尔数组
+    missing_per_frame = total_nan_per_frame - land_pixels
+    ratios = missing_per_frame / max(ocean_pixels, 1)
+
+    lo, hi = missing_ratio_range
+    valid_frames = np.flatnonzero((ratios >= lo) & (ratios <= hi))[:mask_count]
+    # 预分配连续的 (k,H,W) 输出缓冲并用 out= 原地写入，
+    # 不再为 isnan 和 & 各分配一个同尺寸临时数组
+    cloud_masks = np.empty((valid_frames.size,) + land_mask.shape, dtype=bool)
+    if isnull is None:
+        # 逐帧写入，临时内存上界为单帧而非全部选中帧
+        for k, t in enumerate(valid_frames):
+            np.logical_and(np.isnan(data.data[t]), ocean_mask, out=cloud_masks[k])
+    else:
+        np.logical_and(np.asarray(isnull.isel({time_dim: valid_frames}).values),
+                       ocean_mask, out=cloud_masks)
+
+    ds.close()
+
+    np.save(output_path, {'land_mask': land_mask, 'cloud_masks': cloud_masks})
+
+    return {
+        'masks_path': output_path,
+        'n_masks': int(cloud_masks.shape[0]),
+        'n_frames_scanned': int(n_frames),
+        'valid_frames': valid_frames.tolist(),
+        'ocean_pixels': ocean_pixels,
+        'land_mask_path': output_path,
+        'land_mask_shape': list(land_mask.shape),
+        'missing_ratio_range': [float(lo), float(hi)]
+    }
+
+
+def apply_masks_to_netcdf(file_path: str,
+                          masks_path: str,
+                          output_path: str,
+                          variable_name: str = 'sst',
+                          n_frames: Optional[int] = None,
+                          lat_range: Optional[Tuple[float, float]] = None,
+                          lon_range: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+    """
+    将云掩码应用到NetCDF数据，生成HDF5训练数据
+
+    输出包含带云遮挡的 input_sst、完整的 ground_truth_sst
+    以及实际生效的 effective_cloud_mask。
+
+    Args:
+        file_path: 输入NC文件路径
+        masks_path: generate_masks_from_netcdf 生成的掩码文件
+        output_path: 输出HDF5路径
+        variable_name: 变量名称
+        n_frames: 处理帧数（默认取数据与掩码的较小值）
+        lat_range: 可选纬度裁剪区间
+        lon_range: 可选经度裁剪区间
+
+    Returns:
+        dict: 输出文件元数据
+    """
+    import h5py
+
+    # 懒加载打开（优先h5netcdf）：变量保持dask分块，按帧区间流式处理，
+    # 峰值内存为一个64帧块而非整个 (T,H,W) 立方体
+    ds = _open_dataset(file_path, chunks={'time': 64})
+    lat_name, lon_name = _coord_names(ds)
+    if lat_range is not None:
+        ds = ds.sel({lat_name: slice(*lat_range)})
+    if lon_range is not None:
+        ds = ds.sel({lon_name: slice(*lon_range)})
+
+    data = ds[variable_name]
+    latitudes = ds[lat_name].values
+    longitudes = ds[lon_name].values
+
+    masks_data = np.load(masks_path, allow_pickle=True)
+    if masks_data.dtype == object:
+        # .item() 每次都会重新unpickle整个0维对象数组，只取一次
+        payload = masks_data.item()
+        land_mask = payload.get('land_mask')
+        cloud_masks = payload.get('cloud_masks')
+    else:
+        land_mask = None
+        cloud_masks = masks_data
+
+    if n_frames is None:
+        n_frames = min(data.shape[0], cloud_masks.shape[0])
+    if n_frames == 0:
+        # 掩码文件可能不含任何云掩码（没有帧落在缺失比例区间内，
+        # 属正常结果）；h5py不接受0帧数据集的chunk形状，提前报错
+        ds.close()
+        raise ValueError(
+            '没有可处理的帧：掩码文件不含云掩码或数据为空，'
+            '请放宽 missing_ratio_range 后重新生成掩码')
+
+    # int16+scale_factor存储的SST产品经xarray解码后是float64；
+    # SST分辨率(~0.01K)用float32足够，载荷减半直接加速所有下游操作
+    out_dtype = np.dtype(np.float32)
+    frame_shape = tuple(data.shape[1:])
+    cube_shape = (n_frames,) + frame_shape
+    ocean_mask = ~land_mask if land_mask is not None else None
+
+    # 逐帧chunk对齐训练时的按帧读取；gzip(DEFLATE)是串行CPU瓶颈，
+    # 换用Blosc+zstd/LZF
+    comp = _h5_compression()
+    chunk_frames = 64
+    with h5py.File(output_path, 'w') as f:
+        dset_in = _create_float_dataset(f, 'input_sst', cube_shape, out_dtype, comp)
+        dset_gt = _create_float_dataset(f, 'ground_truth_sst', cube_shape,
+                                        out_dtype, comp)
+        # 布尔掩码按位打包：1 bit/像素而非1 byte/像素，落盘体积减少8倍；
+        # 读取端用 np.unpackbits(..., axis=-1, count=orig_width) 还原
+        packed_shape = cube_shape[:-1] + ((cube_shape[-1] + 7) // 8,)
+        mask_dset = f.create_dataset('effective_cloud_mask', shape=packed_shape,
+                                     dtype=np.uint8,
+                                     chunks=(min(chunk_frames, n_frames),) + packed_shape[1:],
+                                     **comp)
+        mask_dset.attrs['packed_axis'] = -1
+        mask_dset.attrs['orig_width'] = cube_shape[-1]
+
+        for t0 in range(0, n_frames, chunk_frames):
+            t1 = min(t0 + chunk_frames, n_frames)
+            block = np.asarray(data[t0:t1].values, dtype=out_dtype)
+
+            mask_block = cloud_masks[t0:t1]
+            if ocean_mask is not None:
+                mask_block = mask_block & ocean_mask
+
+            _write_frames(dset_gt, t0, block, comp)
+            # 单次融合select生成遮挡输入，替代 copy + 掩码写 的两遍访问
+            _write_frames(dset_in, t0, np.where(mask_block, np.nan, block), comp)
+            mask_dset[t0:t1] = np.packbits(mask_block, axis=-1)
+
+        f.create_dataset('latitudes', data=latitudes)
+        f.create_dataset('longitudes', data=longitudes)
+
+    ds.close()
+
+    return {
+        'output_path': output_path,
+        'n_frames': int(n_frames),
+        'shape': list(cube_shape)
+    }
+
+
+def calculate_statistics_netcdf(file_path: str,
+                                variable_name: str = 'sst') -> Dict[str, Any]:
+    """
+    计算NetCDF变量的整体统计量
+
+    Args:
+        file_path: 输入NC文件路径
+        variable_name: 变量名称
+
+    Returns:
+        dict: 统计结果
+    """
+    ds = xr.open_dataset(file_path)
+    data = ds[variable_name].values
+
+    # 单次分块遍历同时累积均值/方差/极值/NaN计数，
+    # 代替对整个立方体的七次独立 nan* 归约
+    total = 0.0
+    total_sq = 0.0
+    nan_count = 0
+    data_min = np.inf
+    data_max = -np.inf
+
+    frame_size = max(1, int(np.prod(data.shape[1:], dtype=np.int64)))
+    chunk = max(1, (16 * 1024 * 1024) // (frame_size * data.dtype.itemsize))
+    for i in range(0, data.shape[0], chunk):
+        block = data[i:i + chunk]
+        block_nan = int(np.count_nonzero(np.isnan(block)))
+        nan_count += block_nan
+        if block_nan < block.size:
+            total += float(np.nansum(block, dtype=np.float64))
+            total_sq += float(np.nansum(np.square(block, dtype=np.float64)))
+            data_min = min(data_min, float(np.nanmin(block)))
+            data_max = max(data_max, float(np.nanmax(block)))
+
+    valid = data.size - nan_count
+    mean = total / valid if valid else float('nan')
+    std = float(np.sqrt(max(total_sq / valid - mean * mean, 0.0))) if valid else float('nan')
+
+    stats = {
+        'mean': mean,
+        'std': std,
+        'min': data_min if valid else float('nan'),
+        'max': data_max if valid else float('nan'),
+        'nan_count': nan_count,
+        'nan_ratio': float(nan_count / data.size),
+        'shape': list(data.shape)
+    }
+
+    ds.close()
+    return stats
+
+
+def resample_netcdf(file_path: str,
+                    output_path: str,
+                    target_grid: Tuple[int, int],
+                    variable_name: str = 'sst') -> Dict[str, Any]:
+    """
+    将NetCDF变量重采样到目标网格（双线性）
+
+    Args:
+        file_path: 输入NC文件路径
+        output_path: 输出NC路径
+        target_grid: 目标 (H, W)
+        variable_name: 变量名称
+
+    Returns:
+        dict: 重采样元数据
+    """
+    from scipy.ndimage import zoom
+
+    ds = xr.open_dataset(file_path)
+    lat_name, lon_name = _coord_names(ds)
+    data = ds[variable_name].values
+    latitudes = ds[lat_name].values
+    longitudes = ds[lon_name].values
+
+    # 逐帧2D重采样写入预分配缓冲：时间维factor为1时n维样条引擎
+    # 仍会对整个(T,H,W)立方体做通用分配，按帧处理则完全向量化在2D上
+    factors = (target_grid[0] / data.shape[1], target_grid[1] / data.shape[2])
+    resampled = np.empty((data.shape[0], target_grid[0], target_grid[1]),
+                         dtype=data.dtype)
+    for t in range(data.shape[0]):
+        zoom(data[t], factors, order=1, output=resampled[t])
+
+    # 坐标本身是线性网格，直接linspace即可，无需调用样条引擎
+    new_lat = np.linspace(latitudes[0], latitudes[-1], target_grid[0])
+    new_lon = np.linspace(longitudes[0], longitudes[-1], target_grid[1])
+
+    out_ds = xr.Dataset(
+        {variable_name: (('time', lat_name, lon_name), resampled)},
+        coords={'time': ds['time'].values, lat_name: new_lat, lon_name: new_lon}
+    )
+    out_ds.to_netcdf(output_path)
+    ds.close()
+
+    return {
+        'output_path': output_path,
+        'original_shape': list(data.shape),
+        'output_shape': list(resampled.shape)
+    }
+
+
+def merge_netcdf_files(file_paths: List[str],
+                       output_path: str,
+                       time_dim: str = 'time') -> Dict[str, Any]:
+    """
+    按时间维合并多个NetCDF文件
+
+    Args:
+        file_paths: 输入NC文件列表
+        output_path: 输出NC路径
+        time_dim: 时间维名称
+
+    Returns:
+        dict: 合并元数据
+    """
+    # open_mfdataset: dask线程并行读取、输出逐块流式写出，
+    # 常驻内存为块大小而非全部文件之和；缺少dask时回退eager合并
+    datasets = None
+    try:
+        merged = xr.open_mfdataset(file_paths, concat_dim=time_dim,
+                                   combine='nested', parallel=True,
+                                   chunks={time_dim: 64})
+    except (ImportError, ValueError):
+        datasets = [xr.open_dataset(p) for p in file_paths]
+        merged = xr.concat(datasets, dim=time_dim)
+
+    merged = merged.sortby(time_dim)
+    merged.to_netcdf(output_path)
+
+    total_frames = int(merged.dims[time_dim])
+    merged.close()
+    if datasets is not None:
+        for d in datasets:
+            d.close()
+
+    return {
+        'output_path': output_path,
+        'n_files': len(file_paths),
+        'total_frames': total_frames
+    }
+
+
+def main():
+    """掩码处理器命令行入口"""
+    if len(sys.argv) < 2:
+        print(json.dumps({'error': 'No command specified'}))
+        sys.exit(1)
+
+    command = sys.argv[1]
+    args = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
+
+    commands = {
+        'generate_masks': generate_masks_from_netcdf,
+        'apply_masks': apply_masks_to_netcdf,
+        'statistics': calculate_statistics_netcdf,
+        'resample': resample_netcdf,
+        'merge': merge_netcdf_files
+    }
+
+    try:
+        handler = commands.get(command)
+        if handler is None:
+            result = {'error': f'Unknown command: {command}'}
+        else:
+            result = handler(**args)
+        print(json.dumps(result, separators=(',', ':')))
+    except Exception as e:
+        print(json.dumps({'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
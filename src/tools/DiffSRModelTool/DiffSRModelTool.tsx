@@ -155,9 +155,7 @@ export const DiffSRModelTool = {
 			const pythonScript = `
 import sys
 import json
-import torch
-import yaml
-from pathlib import Path
+import os
 
 model_type = "${model_type}"
 operation = "${operation}"
@@ -169,14 +167,21 @@ batch_size = ${params.batch_size}
 lr = ${params.learning_rate}
 gpu_id = ${params.gpu_id}
 
+def _detect_device(gpu_id):
+    # Live CUDA probe; only worth the ~1-2 s torch import when a tensor op
+    # actually runs. Config-only paths should use the plain string below.
+    import torch
+    return str(torch.device(f'cuda:{gpu_id}' if gpu_id >= 0 and torch.cuda.is_available() else 'cpu'))
+
 try:
-    # Set device
-    device = torch.device(f'cuda:{gpu_id}' if gpu_id >= 0 and torch.cuda.is_available() else 'cpu')
+    # This script only echoes configuration, so the device is reported as a
+    # string without importing torch
+    device = f'cuda:{gpu_id}' if gpu_id >= 0 else 'cpu'
 
     result = {
         'operation': operation,
         'model_type': model_type,
-        'device': str(device),
+        'device': device,
         'status': 'initialized'
     }
 
@@ -201,7 +206,11 @@ try:
         result['data_path'] = data_path
         result['message'] = f'Inference {model_type} model configured.'
 
-    print(json.dumps(result, indent=2))
+    # Compact by default; Kode parses this output programmatically
+    if os.environ.get('KODE_PRETTY') == '1':
+        print(json.dumps(result, indent=2))
+    else:
+        print(json.dumps(result, separators=(',', ':')))
 
 except Exception as e:
     print(json.dumps({'error': str(e)}), file=sys.stderr)